@@ -1,24 +1,59 @@
 import os
+import re
+import sys
+import json
+import time
 import boto3
+import atexit
+import hashlib
 import argparse
+import threading
+from collections import OrderedDict
+
+try:
+    # C-accelerated serializer; used for --json output when available
+    import orjson
+except ImportError:
+    orjson = None
+from botocore.config import Config
+from botocore.exceptions import ClientError
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, List
+from pathlib import Path
+from typing import Dict, List, Optional
 from tabulate import tabulate
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Pipeline branch configuration almost never changes, so cached entries
+# stay valid for a day before we re-ask AWS
+CACHE_DIR = Path("~/.cache/awspipemon").expanduser()
+BRANCH_CACHE_TTL = 24 * 60 * 60  # seconds
+# Execution state rarely changes within a polling interval, so runs
+# repeated within a few seconds can reuse the previous table
+TABLE_CACHE_TTL = 10  # seconds
+TABLE_CACHE_MAX_FILES = 32
+# Execution IDs are immutable, so resolved commit messages never expire;
+# bound the cache with LRU eviction instead of a TTL
+COMMIT_CACHE_MAX_ENTRIES = 10_000
+
 
 class PipelineMonitor:
     def __init__(self, name_filters: List[str]):
-        load_dotenv()
-
-        # Get AWS credentials from environment variables
-        self.aws_access_key_id = os.getenv("AWS_ACCESS_KEY_ID")
-        self.aws_secret_access_key = os.getenv("AWS_SECRET_ACCESS_KEY")
-        self.aws_session_token = os.getenv("AWS_SESSION_TOKEN")
-        self.aws_region = os.getenv("AWS_REGION", "eu-west-1")
-        self.name_filters = [f.lower() for f in name_filters]
+        # Get AWS credentials from environment variables (.env is already
+        # loaded once at module import)
+        env = os.environ
+        self.aws_access_key_id = env.get("AWS_ACCESS_KEY_ID")
+        self.aws_secret_access_key = env.get("AWS_SECRET_ACCESS_KEY")
+        self.aws_session_token = env.get("AWS_SESSION_TOKEN")
+        self.aws_region = env.get("AWS_REGION", "eu-west-1")
+        self.name_filters = tuple(f.lower() for f in name_filters)
+        # One compiled alternation scans each pipeline name in a single
+        # pass instead of looping over the filters in Python
+        self._filter_re = re.compile(
+            "|".join(re.escape(f) for f in self.name_filters)
+        )
 
         if not all(
             [self.aws_access_key_id, self.aws_secret_access_key, self.aws_session_token]
@@ -26,14 +61,93 @@ class PipelineMonitor:
             raise ValueError("AWS credentials not found in environment variables")
 
         # Initialize AWS clients
+        # boto3 clients are thread-safe, so a single client is shared by all
+        # worker threads; size the connection pool to match and use adaptive
+        # retries so parallel calls back off gracefully when throttled
         self.codepipeline = boto3.client(
             "codepipeline",
             aws_access_key_id=self.aws_access_key_id,
             aws_secret_access_key=self.aws_secret_access_key,
             aws_session_token=self.aws_session_token,
             region_name=self.aws_region,
+            config=Config(
+                max_pool_connections=32,
+                retries={"mode": "adaptive", "max_attempts": 10},
+                # Keep connections warm across the many per-pipeline calls
+                # and fail fast instead of hanging on dead connections
+                tcp_keepalive=True,
+                connect_timeout=3,
+                read_timeout=10,
+            ),
         )
 
+        # In-memory branch cache of (branch, fetched_at) pairs, seeded from
+        # disk so repeated runs skip the get_pipeline call entirely
+        self._branch_cache = self._load_branch_cache()
+
+        # Commit messages keyed by execution ID, persisted at exit;
+        # OrderedDict gives us LRU eviction when the cache fills up
+        self._commit_cache = self._load_commit_cache()
+        atexit.register(self._save_commit_cache)
+
+        # Throttled calls are counted across the worker threads and
+        # reported as one summary line per run instead of one line each
+        self._throttle_count = 0
+        self._throttle_lock = threading.Lock()
+
+    @staticmethod
+    def _load_branch_cache() -> Dict[str, List]:
+        """Load cached pipeline branches, dropping entries older than the TTL"""
+        try:
+            with open(CACHE_DIR / "branches.json") as f:
+                cached = json.load(f)
+            # Keep each entry's original fetch time so the TTL measures age
+            # since the branch was fetched from AWS, not since the last run
+            cutoff = time.time() - BRANCH_CACHE_TTL
+            return {
+                name: (branch, fetched_at)
+                for name, (branch, fetched_at) in cached.items()
+                if fetched_at > cutoff
+            }
+        except (OSError, ValueError):
+            return {}
+
+    def _save_branch_cache(self):
+        """Persist the branch cache to disk for future runs"""
+        try:
+            CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            tmp_path = CACHE_DIR / "branches.json.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self._branch_cache, f)
+            os.replace(tmp_path, CACHE_DIR / "branches.json")
+        except OSError as e:
+            print(f"Warning: could not save branch cache: {str(e)}", file=sys.stderr)
+
+    @staticmethod
+    def _load_commit_cache() -> "OrderedDict[str, str]":
+        """Load cached commit messages keyed by execution ID"""
+        try:
+            with open(CACHE_DIR / "commits.json") as f:
+                return OrderedDict(json.load(f))
+        except (OSError, ValueError):
+            return OrderedDict()
+
+    def _save_commit_cache(self):
+        """Persist the commit message cache to disk at exit"""
+        try:
+            CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            tmp_path = CACHE_DIR / "commits.json.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(list(self._commit_cache.items()), f)
+            os.replace(tmp_path, CACHE_DIR / "commits.json")
+        except OSError as e:
+            print(f"Warning: could not save commit cache: {str(e)}", file=sys.stderr)
+
+    def _count_throttle(self):
+        """Record a throttled call for the end-of-run summary line"""
+        with self._throttle_lock:
+            self._throttle_count += 1
+
     def get_latest_execution(self, pipeline_name: str) -> Dict:
         """Get the latest execution for a specific pipeline"""
         try:
@@ -43,124 +157,273 @@ class PipelineMonitor:
             )
             executions = response.get("pipelineExecutionSummaries", [])
             return executions[0] if executions else None
+        except ClientError as e:
+            if e.response["Error"]["Code"] == "ThrottlingException":
+                self._count_throttle()
+            else:
+                print(
+                    f"Error getting latest execution for pipeline {pipeline_name}: {str(e)}",
+                    file=sys.stderr,
+                )
+            return None
         except Exception as e:
             print(
-                f"Error getting latest execution for pipeline {pipeline_name}: {str(e)}"
+                f"Error getting latest execution for pipeline {pipeline_name}: {str(e)}",
+                file=sys.stderr,
             )
             return None
 
-    def get_commit_message(self, pipeline_name: str, execution_id: str) -> str:
-        """Get commit message from pipeline execution"""
-        try:
-            response = self.codepipeline.get_pipeline_execution(
-                pipelineName=pipeline_name, pipelineExecutionId=execution_id
-            )
-
-            execution = response.get("pipelineExecution", {})
-            if not execution:
-                return "Unknown"
-
-            # Look for the source action in the execution
-            for stage in execution.get("artifactRevisions", []):
-                if not "helm" in stage.get("name", "").lower():
-                    revision_summary = stage.get("revisionSummary", "")
-                    # Extract commit message from revision summary
-                    # Format is usually like "commit message (branch: branch-name)"
-                    if 'CommitMessage":"' in revision_summary:
-                        commit_message = revision_summary.split('CommitMessage":')[1][
-                            1:-2
-                        ]
-                    else:
-                        commit_message = revision_summary
-                    return commit_message
-
-            return "Unknown"
-        except Exception as e:
-            print(
-                f"Error getting commit message for pipeline {pipeline_name}: {str(e)}"
-            )
-            return "Unknown"
+    def get_commit_message(self, execution: Dict) -> str:
+        """Get commit message from a pipeline execution summary"""
+        # Execution IDs are immutable, so a previously resolved message
+        # can be reused as-is
+        execution_id = execution.get("pipelineExecutionId", "")
+        cached = self._commit_cache.get(execution_id)
+        if cached is not None:
+            self._commit_cache.move_to_end(execution_id)
+            return cached
+
+        commit_message = self._parse_commit_message(execution)
+        # Only cache resolved messages - an in-progress execution may not
+        # have its source revisions populated yet, and caching the
+        # placeholder would pin "Unknown" to the ID forever
+        if execution_id and commit_message and commit_message != "Unknown":
+            self._commit_cache[execution_id] = commit_message
+            if len(self._commit_cache) > COMMIT_CACHE_MAX_ENTRIES:
+                self._commit_cache.popitem(last=False)
+        return commit_message
+
+    @staticmethod
+    def _parse_commit_message(execution: Dict) -> str:
+        """Extract the commit message from the execution's source revisions"""
+        # The execution summaries from list_pipeline_executions already
+        # carry the source revisions, so no extra AWS call is needed
+        for revision in execution.get("sourceRevisions", []):
+            if not "helm" in revision.get("actionName", "").lower():
+                revision_summary = revision.get("revisionSummary", "")
+                # The revision summary is either a JSON blob with a
+                # CommitMessage field or the plain commit message itself
+                try:
+                    commit_message = json.loads(revision_summary).get(
+                        "CommitMessage", revision_summary
+                    )
+                except (ValueError, TypeError, AttributeError):
+                    commit_message = revision_summary
+                return commit_message
+
+        return "Unknown"
 
     def get_pipeline_branch(self, pipeline_name: str) -> str:
         """Get the branch name from pipeline configuration"""
+        # Branch configuration rarely changes, so serve from cache when we can
+        cached = self._branch_cache.get(pipeline_name)
+        if cached is not None:
+            return cached[0]
+
         try:
             # Get the pipeline configuration
             response = self.codepipeline.get_pipeline(name=pipeline_name)
             pipeline = response.get("pipeline", {})
 
-            # Find the source stage
-            for stage in pipeline.get("stages", []):
-                if stage.get("name", "").lower() == "source":
-                    # Find the source action
-                    for action in stage.get("actions", []):
-                        # Get the configuration
-                        configuration = action.get("configuration", {})
-                        # The branch is in the BranchName configuration
-                        branch = configuration.get("BranchName")
-                        if branch:
-                            return branch
+            # Find the source stage; stop scanning once it has been seen
+            for stage in pipeline.get("stages", ()):
+                if stage.get("name", "").lower() != "source":
+                    continue
+                # The branch is in the BranchName configuration of a
+                # source action
+                for action in stage.get("actions", ()):
+                    branch = action.get("configuration", {}).get("BranchName")
+                    if branch:
+                        self._branch_cache[pipeline_name] = (branch, time.time())
+                        return branch
+                break
 
             return "Unknown"
+        except ClientError as e:
+            if e.response["Error"]["Code"] == "ThrottlingException":
+                self._count_throttle()
+            else:
+                print(
+                    f"Error getting branch for pipeline {pipeline_name}: {str(e)}",
+                    file=sys.stderr,
+                )
+            return "Unknown"
         except Exception as e:
-            print(f"Error getting branch for pipeline {pipeline_name}: {str(e)}")
+            print(
+                f"Error getting branch for pipeline {pipeline_name}: {str(e)}",
+                file=sys.stderr,
+            )
             return "Unknown"
 
     def format_duration(self, start_time: datetime, end_time: datetime = None) -> str:
         """Format the duration between two timestamps"""
-        if not end_time:
-            end_time = datetime.now()
-        duration = end_time - start_time
-        total_seconds = int(duration.total_seconds())
+        total_seconds = int(((end_time or datetime.now()) - start_time).total_seconds())
+        hours, remainder = divmod(total_seconds, 3600)
+        minutes, seconds = divmod(remainder, 60)
 
-        hours = total_seconds // 3600
-        minutes = (total_seconds % 3600) // 60
-        seconds = total_seconds % 60
-
-        if hours > 0:
+        if hours:
             return f"{hours}h {minutes}m"
-        elif minutes > 0:
+        if minutes:
             return f"{minutes}m {seconds}s"
-        else:
-            return f"{seconds}s"
-
-    def format_date(self, date: datetime) -> str:
-        """Format date in dd/mm/yy hh:mm format"""
-        return date.strftime("%d/%m/%Y %H:%M")
+        return f"{seconds}s"
+
+    @staticmethod
+    def format_date(date: datetime) -> str:
+        """Format date in dd/mm/yyyy hh:mm format"""
+        # Direct attribute access beats re-parsing the strftime spec on
+        # every row
+        return (
+            f"{date.day:02d}/{date.month:02d}/{date.year} "
+            f"{date.hour:02d}:{date.minute:02d}"
+        )
 
     def list_all_pipelines(self) -> List[str]:
         """List all pipelines in the account that match any of the name filters"""
         try:
-            response = self.codepipeline.list_pipelines()
-            all_pipelines = [
-                pipeline["name"] for pipeline in response.get("pipelines", [])
-            ]
-            # Filter pipelines based on the name filters
-            return [
-                pipeline
-                for pipeline in all_pipelines
-                if any(f in pipeline.lower() for f in self.name_filters)
-            ]
+            # Paginate - a single list_pipelines call silently truncates
+            # at 1000 pipelines; filter while streaming pages
+            paginator = self.codepipeline.get_paginator("list_pipelines")
+            matched = []
+            for page in paginator.paginate():
+                for pipeline in page.get("pipelines", []):
+                    name = pipeline["name"]
+                    if self._filter_re.search(name.lower()):
+                        matched.append(name)
+            return matched
         except Exception as e:
-            print(f"Error listing pipelines: {str(e)}")
+            print(f"Error listing pipelines: {str(e)}", file=sys.stderr)
             return []
 
-    def monitor_pipelines(self):
-        """Main function to monitor pipelines"""
-        print("\n=== AWS CodePipeline Deployment Monitor ===")
-        print(f"Last updated: {self.format_date(datetime.now())}")
-        print(f"Filtering pipelines containing: {', '.join(self.name_filters)}\n")
+    @staticmethod
+    def _render_grid(headers: List[str], rows: List[List]) -> str:
+        """Render rows in tabulate's grid format with one width pass
+
+        tabulate walks every cell several times; for large tables a single
+        width computation plus str.ljust is noticeably faster.
+        """
+        # Match tabulate's sizing so output is identical either side of
+        # the row-count threshold: cells are stripped of surrounding
+        # whitespace and headers get 2 extra padding spaces (MIN_PADDING)
+        cleaned = [[str(cell).strip() for cell in row] for row in rows]
+        widths = [
+            max(len(header) + 2, *(len(cell) for cell in cells))
+            for header, *cells in zip(headers, *cleaned)
+        ]
+        separator = "+" + "+".join("-" * (w + 2) for w in widths) + "+"
+        header_separator = "+" + "+".join("=" * (w + 2) for w in widths) + "+"
+
+        def render_row(row):
+            return (
+                "| "
+                + " | ".join(cell.ljust(w) for cell, w in zip(row, widths))
+                + " |"
+            )
 
-        # Get filtered pipelines
-        pipelines = self.list_all_pipelines()
+        lines = [separator, render_row(headers), header_separator]
+        for row in cleaned:
+            lines.append(render_row(row))
+            lines.append(separator)
+        return "\n".join(lines)
+
+    @staticmethod
+    def _emit_json(headers: List[str], table_data: List[List]):
+        """Write the table as a JSON array of objects for scripted callers"""
+        payload = [dict(zip(headers, row)) for row in table_data]
+        if orjson is not None:
+            sys.stdout.buffer.write(orjson.dumps(payload))
+            sys.stdout.buffer.write(b"\n")
+        else:
+            print(json.dumps(payload))
 
-        if not pipelines:
+    def _print_table(self, headers: List[str], table_data: List[List]):
+        """Print the table, using the fast renderer for large outputs"""
+        if len(table_data) > 100:
+            print(self._render_grid(headers, table_data))
+        else:
+            print(tabulate(table_data, headers=headers, tablefmt="grid"))
+
+    def _table_cache_path(self) -> Path:
+        """Path of the table cache file for this filter set"""
+        key = hashlib.sha1(",".join(sorted(self.name_filters)).encode()).hexdigest()
+        return CACHE_DIR / f"table-{key[:12]}.json"
+
+    def _load_table_cache(self, max_age: float = TABLE_CACHE_TTL) -> Optional[List[List]]:
+        """Load the cached table for this filter set if it is still fresh"""
+        path = self._table_cache_path()
+        try:
+            if path.stat().st_mtime < time.time() - max_age:
+                return None
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _save_table_cache(self, table_data: List[List]):
+        """Persist the rendered table data and evict the oldest cache files"""
+        try:
+            CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            tmp_path = self._table_cache_path().with_suffix(".tmp")
+            with open(tmp_path, "w") as f:
+                json.dump(table_data, f)
+            os.replace(tmp_path, self._table_cache_path())
+
+            # Keep only the most recently used filter sets around
+            cache_files = sorted(
+                CACHE_DIR.glob("table-*.json"),
+                key=lambda p: p.stat().st_mtime,
+                reverse=True,
+            )
+            for stale in cache_files[TABLE_CACHE_MAX_FILES:]:
+                stale.unlink(missing_ok=True)
+        except OSError as e:
+            print(f"Warning: could not save table cache: {str(e)}", file=sys.stderr)
+
+    def _build_row(
+        self, pipeline: str, execution: Optional[Dict], branch: str, now: datetime
+    ) -> Optional[List]:
+        """Build the table row for a pipeline, or None if it has no executions"""
+        if not execution:
+            return None
+
+        status = execution.get("status", "UNKNOWN")
+        start_time = execution.get("startTime", now)
+        last_update_time = execution.get("lastUpdateTime", now)
+
+        # Format the last run time
+        last_run = self.format_date(start_time)
+
+        # Calculate duration; CodePipeline returns datetimes for these
+        # fields, so handle the odd malformed value instead of type-checking
+        # every row
+        try:
+            duration = self.format_duration(start_time, last_update_time)
+        except TypeError:
+            duration = "Unknown"
+
+        commit_message = self.get_commit_message(execution)
+
+        # Truncate long commit messages
+        if len(commit_message) > 50:
+            commit_message = commit_message[:50] + "..."
+
+        return [pipeline, branch, status, last_run, duration, commit_message]
+
+    def monitor_pipelines(
+        self, as_json: bool = False, max_age: float = TABLE_CACHE_TTL
+    ):
+        """Main function to monitor pipelines"""
+        # One timestamp per run - the .get defaults below would otherwise
+        # call datetime.now() twice per pipeline
+        now = datetime.now()
+
+        if not as_json:
+            print("\n=== AWS CodePipeline Deployment Monitor ===")
+            print(f"Last updated: {self.format_date(now)}")
             print(
-                f"No pipelines found containing any of: {', '.join(self.name_filters)}"
+                f"Filtering pipelines containing: {', '.join(self.name_filters)}\n"
             )
-            return
 
         # Prepare data for tabulation
-        table_data = []
         headers = [
             "Pipeline",
             "Branch",
@@ -170,43 +433,70 @@ class PipelineMonitor:
             "Commit Message",
         ]
 
-        for pipeline in pipelines:
-            execution = self.get_latest_execution(pipeline)
-            if not execution:
-                continue
-
-            status = execution.get("status", "UNKNOWN")
-            execution_id = execution.get("pipelineExecutionId", "")
-            start_time = execution.get("startTime", datetime.now())
-            last_update_time = execution.get("lastUpdateTime", datetime.now())
+        # Serve the previous table when this filter set was queried within
+        # max_age seconds - execution state won't have changed yet; a
+        # max_age of 0 forces a fresh fetch
+        cached_table = self._load_table_cache(max_age) if max_age > 0 else None
+        if cached_table is not None:
+            if as_json:
+                self._emit_json(headers, cached_table)
+            else:
+                self._print_table(headers, cached_table)
+                print()
+            return
 
-            # Format the last run time
-            last_run = self.format_date(start_time)
+        # Get filtered pipelines
+        pipelines = self.list_all_pipelines()
 
-            # Calculate duration
-            if isinstance(start_time, datetime) and isinstance(
-                last_update_time, datetime
-            ):
-                duration = self.format_duration(start_time, last_update_time)
+        if not pipelines:
+            if as_json:
+                self._emit_json(headers, [])
             else:
-                duration = "Unknown"
+                print(
+                    f"No pipelines found containing any of: {', '.join(self.name_filters)}"
+                )
+            return
 
-            branch = self.get_pipeline_branch(pipeline)
-            commit_message = self.get_commit_message(pipeline, execution_id)
+        # Sort by pipeline name up front; executor.map preserves input
+        # order, so the rows come back already sorted
+        pipelines.sort()
+
+        # Query all pipelines in parallel - the work is IO-bound on AWS
+        # round-trips, so threads overlap the network waits. Fan out one
+        # API at a time: CodePipeline throttles per API, so keeping each
+        # stage homogeneous uses each quota fully and a slow endpoint
+        # doesn't stall calls to the others
+        self._throttle_count = 0
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            executions = list(executor.map(self.get_latest_execution, pipelines))
+            branches = list(executor.map(self.get_pipeline_branch, pipelines))
+
+        if self._throttle_count:
+            print(
+                f"Warning: {self._throttle_count} calls throttled by CodePipeline; "
+                "some rows may be missing or incomplete",
+                file=sys.stderr,
+            )
 
-            # Truncate long commit messages
-            if len(commit_message) > 50:
-                commit_message = commit_message[:50] + "..."
+        rows = (
+            self._build_row(pipeline, execution, branch, now)
+            for pipeline, execution, branch in zip(pipelines, executions, branches)
+        )
+        table_data = [row for row in rows if row is not None]
 
-            table_data.append(
-                [pipeline, branch, status, last_run, duration, commit_message]
-            )
+        # Persist newly resolved branches for future runs
+        self._save_branch_cache()
 
-        # Sort by pipeline name
-        table_data.sort(key=lambda x: x[0])
+        # Remember this table for runs repeated within the TTL
+        self._save_table_cache(table_data)
+
+        if as_json:
+            # Structured output for scripted callers - skip rendering
+            self._emit_json(headers, table_data)
+            return
 
         # Print the table
-        print(tabulate(table_data, headers=headers, tablefmt="grid"))
+        self._print_table(headers, table_data)
         print()
 
 
@@ -222,13 +512,30 @@ if __name__ == "__main__":
             default=["kulu"],
             help="List of filters to match pipeline names (default: kulu)",
         )
+        parser.add_argument(
+            "--json",
+            action="store_true",
+            help="Output the pipeline data as JSON instead of a table",
+        )
+        parser.add_argument(
+            "--max-age",
+            type=float,
+            default=TABLE_CACHE_TTL,
+            help=(
+                "Maximum age in seconds of a cached table to reuse "
+                f"(default: {TABLE_CACHE_TTL}, 0 disables the cache)"
+            ),
+        )
         args = parser.parse_args()
 
         monitor = PipelineMonitor(name_filters=args.filters)
-        monitor.monitor_pipelines()
+        monitor.monitor_pipelines(as_json=args.json, max_age=args.max_age)
     except Exception as e:
-        print(f"Error: {str(e)}")
-        print("\nPlease ensure you have set the following environment variables:")
-        print("AWS_ACCESS_KEY_ID")
-        print("AWS_SECRET_ACCESS_KEY")
-        print("AWS_SESSION_TOKEN")
+        print(f"Error: {str(e)}", file=sys.stderr)
+        print(
+            "\nPlease ensure you have set the following environment variables:",
+            file=sys.stderr,
+        )
+        print("AWS_ACCESS_KEY_ID", file=sys.stderr)
+        print("AWS_SECRET_ACCESS_KEY", file=sys.stderr)
+        print("AWS_SESSION_TOKEN", file=sys.stderr)